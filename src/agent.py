@@ -1,15 +1,20 @@
 import logging
+import logging.config
+import os
+from collections.abc import Callable
 from dataclasses import dataclass, field
-from typing import Annotated, Optional
+from typing import Annotated
 
 import yaml
 from dotenv import load_dotenv
 from pydantic import Field
 
-from livekit.agents import AgentServer, JobContext, cli
+from livekit.agents import AgentServer, JobContext, JobProcess, cli
 from livekit.agents.llm import function_tool
+from livekit.agents.tts import TTS
 from livekit.agents.voice import Agent, AgentSession, RunContext
-from livekit.plugins import assemblyai, openai, inworld, silero
+from livekit.plugins import assemblyai, inworld, openai, silero
+from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
 # from livekit.plugins import noise_cancellation
 
@@ -22,10 +27,34 @@ from livekit.plugins import assemblyai, openai, inworld, silero
 # since only a subset of the tools are used at any given time.
 
 
+# job processes inherit the parent's environment, so .env only needs to be parsed once
+if not os.getenv("_DOTENV_LOADED"):
+    load_dotenv()
+    os.environ["_DOTENV_LOADED"] = "1"
+
+# per-step debug logs are opt-in, set AGENT_DEBUG=1 (and AGENT_STT_DEBUG=1 for the
+# speech-to-text plugin, which would otherwise log from the audio path) to enable them
+LOG_LEVELS = {
+    "restaurant-example": "DEBUG" if os.getenv("AGENT_DEBUG") else "INFO",
+    "livekit.plugins.assemblyai": (
+        "DEBUG" if os.getenv("AGENT_STT_DEBUG") else "WARNING"
+    ),
+}
+
+# incremental, so only the levels are applied and the handlers installed by the
+# LiveKit CLI are left alone
+logging.config.dictConfig(
+    {
+        "version": 1,
+        "incremental": True,
+        "loggers": {name: {"level": level} for name, level in LOG_LEVELS.items()},
+    }
+)
+
 logger = logging.getLogger("restaurant-example")
-logger.setLevel(logging.DEBUG)
 
-load_dotenv()
+# libyaml's emitter when PyYAML was built with it, the pure-Python one otherwise
+_YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
 
 voices = {
     "greeter": "Dennis",
@@ -35,43 +64,80 @@ voices = {
 }
 
 
-@dataclass
+class _LazyAgents(dict[str, Agent]):
+    """Agent registry that only builds an agent the first time it is looked up."""
+
+    def __init__(self, factories: dict[str, Callable[[], Agent]]) -> None:
+        super().__init__()
+        self._factories = factories
+
+    def __missing__(self, name: str) -> Agent:
+        agent = self[name] = self._factories[name]()
+        return agent
+
+
+@dataclass(slots=True)
 class UserData:
-    customer_name: Optional[str] = None
-    customer_phone: Optional[str] = None
+    customer_name: str | None = None
+    customer_phone: str | None = None
 
-    reservation_time: Optional[str] = None
+    reservation_time: str | None = None
 
-    order: Optional[list[str]] = None
+    order: list[str] | None = None
 
-    customer_credit_card: Optional[str] = None
-    customer_credit_card_expiry: Optional[str] = None
-    customer_credit_card_cvv: Optional[str] = None
+    customer_credit_card: str | None = None
+    customer_credit_card_expiry: str | None = None
+    customer_credit_card_cvv: str | None = None
 
-    expense: Optional[float] = None
-    checked_out: Optional[bool] = None
+    expense: float | None = None
+    checked_out: bool | None = None
 
     agents: dict[str, Agent] = field(default_factory=dict)
-    prev_agent: Optional[Agent] = None
+    prev_agent: Agent | None = None
+
+    # (summarized fields, summary) from the last summarize() call
+    _summary_cache: tuple[tuple, str] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def summarize(self) -> str:
+        key = (
+            self.customer_name,
+            self.customer_phone,
+            self.reservation_time,
+            tuple(self.order) if self.order is not None else None,
+            self.customer_credit_card,
+            self.customer_credit_card_expiry,
+            self.customer_credit_card_cvv,
+            self.expense,
+            self.checked_out,
+        )
+        if self._summary_cache is not None and self._summary_cache[0] == key:
+            return self._summary_cache[1]
+
+        card = self.customer_credit_card
+        credit_card = (
+            {
+                "number": card,
+                "expiry": self.customer_credit_card_expiry or "unknown",
+                "cvv": self.customer_credit_card_cvv or "unknown",
+            }
+            if card
+            else None
+        )
         data = {
             "customer_name": self.customer_name or "unknown",
             "customer_phone": self.customer_phone or "unknown",
             "reservation_time": self.reservation_time or "unknown",
             "order": self.order or "unknown",
-            "credit_card": {
-                "number": self.customer_credit_card or "unknown",
-                "expiry": self.customer_credit_card_expiry or "unknown",
-                "cvv": self.customer_credit_card_cvv or "unknown",
-            }
-            if self.customer_credit_card
-            else None,
+            "credit_card": credit_card,
             "expense": self.expense or "unknown",
             "checked_out": self.checked_out or False,
         }
         # summarize in yaml performs better than json
-        return yaml.dump(data)
+        summary = yaml.dump(data, Dumper=_YamlDumper)
+        self._summary_cache = (key, summary)
+        return summary
 
 
 RunContext_T = RunContext[UserData]
@@ -89,7 +155,7 @@ async def update_name(
     Confirm the spelling with the user before calling the function."""
     userdata = context.userdata
     userdata.customer_name = name
-    logger.debug(f"The name is updated to {name}.")
+    logger.debug("The name is updated to %s.", name)
     return f"The name is updated to {name}"
 
 
@@ -102,7 +168,7 @@ async def update_phone(
     Confirm the spelling with the user before calling the function."""
     userdata = context.userdata
     userdata.customer_phone = phone
-    logger.debug(f"The phone number is updated to {phone}.")
+    logger.debug("The phone number is updated to %s.", phone)
     return f"The phone number is updated to {phone}"
 
 
@@ -114,10 +180,21 @@ async def to_greeter(context: RunContext_T) -> Agent:
     return await curr_agent._transfer_to_agent("greeter", context)
 
 
+# appended to the system message on every handoff, the same for all agents
+_STYLE_BLOCK = """Conversation style:
+- Be natural and conversational
+- Ask for information gradually
+- Do not ask for all details at once. You may group closely related details together (for example date and time).
+- Do not repeat or summarize information already given
+- Avoid unnecessary confirmations
+- Keep responses short
+- Once intent is clear, hand off promptly"""
+
+
 class BaseAgent(Agent):
     async def on_enter(self) -> None:
         agent_name = self.__class__.__name__
-        logger.info(f"entering task {agent_name}")
+        logger.info("entering task %s", agent_name)
 
         userdata: UserData = self.session.userdata
         chat_ctx = self.chat_ctx.copy()
@@ -128,26 +205,25 @@ class BaseAgent(Agent):
                 exclude_instructions=True, exclude_function_call=False
             ).truncate(max_items=6)
             existing_ids = {item.id for item in chat_ctx.items}
-            items_copy = [item for item in truncated_chat_ctx.items if item.id not in existing_ids]
-            chat_ctx.items.extend(items_copy)
+            chat_ctx.items.extend(
+                item for item in truncated_chat_ctx.items if item.id not in existing_ids
+            )
 
         # add an instructions including the user data as assistant message
-        logger.debug(f"After entering task {agent_name}, user data summary: {userdata.summarize()}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "After entering task %s, user data summary: %s",
+                agent_name,
+                userdata.summarize(),
+            )
 
         chat_ctx.add_message(
             role="system",  # role=system works for OpenAI's LLM and Realtime API
-            content=f"""You are {agent_name} agent. Current user data is {userdata.summarize()}.
-Conversation style:
-- Be natural and conversational
-- Ask for information gradually
-- Do not ask for all details at once. You may group closely related details together (for example date and time).
-- Do not repeat or summarize information already given
-- Avoid unnecessary confirmations
-- Keep responses short
-- Once intent is clear, hand off promptly""",
+            content=f"You are {agent_name} agent. Current user data is {userdata.summarize()}.\n{_STYLE_BLOCK}",
         )
 
-        logger.debug(f"Updating chat context for agent {agent_name} to {chat_ctx}")
+        # the chat context repr can be large, don't build it unless it's logged
+        logger.debug("Updating chat context for agent %s to %s", agent_name, chat_ctx)
         await self.update_chat_ctx(chat_ctx)
         self.session.generate_reply(tool_choice="none")
 
@@ -157,11 +233,16 @@ Conversation style:
         next_agent = userdata.agents[name]
         userdata.prev_agent = current_agent
 
+        # the next agent's activity prewarms its TTS when it starts, but only after the
+        # current activity has drained and closed; starting here overlaps the two
+        if isinstance(next_agent.tts, TTS):
+            next_agent.tts.prewarm()
+
         return next_agent, f"Transferring to {name}."
 
 
 class Greeter(BaseAgent):
-    def __init__(self, menu: str) -> None:
+    def __init__(self, menu: str, *, tts: TTS) -> None:
         super().__init__(
             instructions=(
                 "You are the restaurant receptionist at \"The Pumpkin Tales Restaurant\".\n\n"
@@ -179,8 +260,7 @@ class Greeter(BaseAgent):
                 "- 'Connecting you to our reservation desk now.'\n"
                 "- 'Transferring you to takeaway ordering.'"
             ),
-            llm=openai.LLM(model="gpt-5-mini", parallel_tool_calls=False),
-            tts=inworld.TTS(model="inworld-tts-1", voice=voices["greeter"], text_normalization="ON"),
+            tts=tts,
         )
         self.menu = menu
 
@@ -201,13 +281,13 @@ class Greeter(BaseAgent):
 
 
 class Reservation(BaseAgent):
-    def __init__(self) -> None:
+    def __init__(self, *, tts: TTS) -> None:
         super().__init__(
             instructions="You are a reservation agent at a restaurant. Your jobs are to ask for "
             "the reservation time, then customer's name, and phone number. Then "
             "confirm the reservation details with the customer.",
             tools=[update_name, update_phone, to_greeter],
-            tts=inworld.TTS(model="inworld-tts-1", voice=voices["reservation"], text_normalization="ON"),
+            tts=tts,
         )
 
     @function_tool()
@@ -220,7 +300,7 @@ class Reservation(BaseAgent):
         Confirm the time with the user before calling the function."""
         userdata = context.userdata
         userdata.reservation_time = time
-        logger.debug(f"The reservation time is updated to {time}.")
+        logger.debug("The reservation time is updated to %s.", time)
         return f"The reservation time is updated to {time}"
 
     @function_tool()
@@ -241,7 +321,7 @@ class Reservation(BaseAgent):
 
 
 class Takeaway(BaseAgent):
-    def __init__(self, menu: str) -> None:
+    def __init__(self, menu: str, *, tts: TTS) -> None:
         super().__init__(
             instructions=(
                 f"Your are a takeaway agent that takes orders from the customer. "
@@ -249,7 +329,7 @@ class Takeaway(BaseAgent):
                 "Clarify special requests and confirm the order with the customer."
             ),
             tools=[to_greeter],
-            tts=inworld.TTS(model="inworld-tts-1", voice=voices["takeaway"], text_normalization="ON"),
+            tts=tts,
         )
 
     @function_tool()
@@ -261,7 +341,7 @@ class Takeaway(BaseAgent):
         """Called when the user create or update their order."""
         userdata = context.userdata
         userdata.order = items
-        logger.debug(f"The order is updated to {items}.")
+        logger.debug("The order is updated to %s.", items)
         return f"The order is updated to {items}"
 
     @function_tool()
@@ -275,7 +355,7 @@ class Takeaway(BaseAgent):
 
 
 class Checkout(BaseAgent):
-    def __init__(self, menu: str) -> None:
+    def __init__(self, menu: str, *, tts: TTS) -> None:
         super().__init__(
             instructions=(
                 f"You are a checkout agent at a restaurant. The menu is: {menu}\n"
@@ -284,7 +364,7 @@ class Checkout(BaseAgent):
                 "information, including the card number, expiry date, and CVV step by step."
             ),
             tools=[update_name, update_phone, to_greeter],
-            tts=inworld.TTS(model="inworld-tts-1", voice=voices["checkout"], text_normalization="ON"),
+            tts=tts,
         )
 
     @function_tool()
@@ -296,7 +376,7 @@ class Checkout(BaseAgent):
         """Called when the user confirms the expense."""
         userdata = context.userdata
         userdata.expense = expense
-        logger.debug(f"The expense is confirmed to be {expense}.")
+        logger.debug("The expense is confirmed to be %s.", expense)
         return f"The expense is confirmed to be {expense}"
 
     @function_tool()
@@ -313,7 +393,12 @@ class Checkout(BaseAgent):
         userdata.customer_credit_card = number
         userdata.customer_credit_card_expiry = expiry
         userdata.customer_credit_card_cvv = cvv
-        logger.debug(f"The credit card details are updated as number: {number}, expiry: {expiry}, CVV: {cvv}.")
+        logger.debug(
+            "The credit card details are updated as number: %s, expiry: %s, CVV: %s.",
+            number,
+            expiry,
+            cvv,
+        )
         return f"The credit card number is updated to {number}"
 
     @function_tool()
@@ -343,24 +428,52 @@ class Checkout(BaseAgent):
 server = AgentServer()
 
 
+def prewarm(proc: JobProcess):
+    proc.userdata["vad"] = silero.VAD.load()
+
+    # build the provider clients once per process and share them between the agents,
+    # instead of opening a new connection pool for every agent in every session
+    proc.userdata["tts"] = {
+        voice: inworld.TTS(model="inworld-tts-1", voice=voice, text_normalization="ON")
+        for voice in voices.values()
+    }
+    # a single client for the whole session; with parallel tool calls disabled the model
+    # can't request two handoffs in the same turn
+    proc.userdata["llm"] = openai.LLM(model="gpt-5-mini", parallel_tool_calls=False)
+
+
+server.setup_fnc = prewarm
+
+
 @server.rtc_session()
 async def entrypoint(ctx: JobContext):
+    tts = ctx.proc.userdata["tts"]
+
     menu = "Pizza: $10, Salad: $5, Ice Cream: $3, Coffee: $2"
-    userdata = UserData()
-    userdata.agents.update(
-        {
-            "greeter": Greeter(menu),
-            "reservation": Reservation(),
-            "takeaway": Takeaway(menu),
-            "checkout": Checkout(menu),
-        }
+    # most calls never get past the greeter, so the other agents are built on first handoff
+    userdata = UserData(
+        agents=_LazyAgents(
+            {
+                "greeter": lambda: Greeter(menu, tts=tts[voices["greeter"]]),
+                "reservation": lambda: Reservation(tts=tts[voices["reservation"]]),
+                "takeaway": lambda: Takeaway(menu, tts=tts[voices["takeaway"]]),
+                "checkout": lambda: Checkout(menu, tts=tts[voices["checkout"]]),
+            }
+        )
     )
     session = AgentSession[UserData](
         userdata=userdata,
-        stt=assemblyai.STT(model="universal-streaming-english"),
-        llm=openai.LLM(model="gpt-5-mini"),
-        tts=inworld.TTS(model="inworld-tts-1", voice="Dennis", text_normalization="ON"),
-        vad=silero.VAD.load(),
+        # tighter end-of-turn endpointing than the server defaults, so finals arrive sooner
+        stt=assemblyai.STT(
+            model="universal-streaming-english",
+            end_of_turn_confidence_threshold=0.4,
+            min_end_of_turn_silence_when_confident=160,
+            max_turn_silence=400,
+        ),
+        llm=ctx.proc.userdata["llm"],
+        tts=tts[voices["greeter"]],
+        vad=ctx.proc.userdata["vad"],
+        turn_detection=MultilingualModel(),
         max_tool_steps=5,
         # to use realtime model, replace the stt, llm, tts and vad with the following
         # llm=openai.realtime.RealtimeModel(voice="alloy"),
@@ -375,4 +488,4 @@ async def entrypoint(ctx: JobContext):
 
 
 if __name__ == "__main__":
-    cli.run_app(server)
\ No newline at end of file
+    cli.run_app(server)
@@ -0,0 +1,65 @@
+import pytest
+import yaml
+
+from agent import UserData
+
+
+def _expected(userdata: UserData) -> dict:
+    """The data UserData.summarize() has always described, built the original way."""
+    return {
+        "customer_name": userdata.customer_name or "unknown",
+        "customer_phone": userdata.customer_phone or "unknown",
+        "reservation_time": userdata.reservation_time or "unknown",
+        "order": userdata.order or "unknown",
+        "credit_card": {
+            "number": userdata.customer_credit_card or "unknown",
+            "expiry": userdata.customer_credit_card_expiry or "unknown",
+            "cvv": userdata.customer_credit_card_cvv or "unknown",
+        }
+        if userdata.customer_credit_card
+        else None,
+        "expense": userdata.expense or "unknown",
+        "checked_out": userdata.checked_out or False,
+    }
+
+
+@pytest.mark.parametrize(
+    "userdata",
+    [
+        UserData(),
+        UserData(
+            customer_name="yes",
+            customer_phone="5551234",
+            reservation_time="tonight at 7: table for 2",
+            order=["Pizza: extra cheese", "Coffee"],
+            customer_credit_card="4111111111111111",
+            customer_credit_card_expiry="12/25",
+            customer_credit_card_cvv="123",
+            expense=12.5,
+            checked_out=True,
+        ),
+        UserData(customer_name="Bob\nchecked_out: true"),
+        UserData(customer_credit_card="4111111111111111"),
+    ],
+)
+def test_summarize_round_trips(userdata: UserData) -> None:
+    """The summary parses back to exactly the user data, whatever the values contain."""
+    assert yaml.safe_load(userdata.summarize()) == _expected(userdata)
+
+
+def test_summarize_sees_in_place_order_changes() -> None:
+    """Appending to the order list rebuilds a cached summary."""
+    userdata = UserData(order=["Pizza"])
+    assert yaml.safe_load(userdata.summarize())["order"] == ["Pizza"]
+
+    userdata.order.append("Salad")
+    assert yaml.safe_load(userdata.summarize())["order"] == ["Pizza", "Salad"]
+
+
+def test_summarize_sees_field_changes() -> None:
+    """Setting a field rebuilds a cached summary."""
+    userdata = UserData()
+    assert yaml.safe_load(userdata.summarize())["customer_name"] == "unknown"
+
+    userdata.customer_name = "Alice"
+    assert yaml.safe_load(userdata.summarize())["customer_name"] == "Alice"